@@ -1,29 +1,79 @@
 """
 ATM Controller - Main business logic for ATM operations
 """
+from collections import deque
 from enum import Enum
-from typing import Optional, List
+from functools import wraps
+from time import monotonic
+from typing import Callable, Optional, List, Deque, Dict, Iterator, Sequence, Tuple, Union
 from interfaces.bank_service import BankService
 from interfaces.cash_dispenser import CashDispenser
 from interfaces.card_reader import CardReader
-from models.card import Card
+from models.card import Card, is_well_formed_card_number
 from models.account import Account
 from models.transaction import Transaction, TransactionType
 from exceptions.atm_exceptions import (
     InvalidCardException,
     InvalidPinException,
-    InsufficientFundsException,
     InsufficientCashException,
     AccountNotFoundException,
     ATMException
 )
 
 
+# Error messages shared by the state guards and session checks
+_MSG_NOT_IDLE = "ATM is not ready to accept a card"
+_MSG_NO_CARD_INSERTED = "No card inserted or PIN already verified"
+_MSG_PIN_NOT_VERIFIED = "PIN not verified"
+_MSG_NO_ACCOUNT_SELECTED = "No account selected"
+_MSG_NO_CARD_INFO = "No card information available"
+_MSG_NO_ACCOUNT_INFO = "No account information available"
+
+
 class ATMState(Enum):
-    IDLE = "idle"
-    CARD_INSERTED = "card_inserted"
-    PIN_VERIFIED = "pin_verified"
-    ACCOUNT_SELECTED = "account_selected"
+    """
+    ATM session states.
+    
+    Each member keeps its string value and also carries a distinct ``flag``
+    bit, so a set of allowed states can be combined with ``|`` and tested
+    with ``&``.
+    """
+    IDLE = ("idle", 1)
+    CARD_INSERTED = ("card_inserted", 2)
+    PIN_VERIFIED = ("pin_verified", 4)
+    ACCOUNT_SELECTED = ("account_selected", 8)
+    
+    def __new__(cls, value: str, flag: int):
+        member = object.__new__(cls)
+        member._value_ = value
+        member.flag = flag
+        return member
+
+
+def require_state(allowed: Union[ATMState, Tuple[ATMState, ...]], message: str) -> Callable:
+    """
+    Restrict a controller method to the given state(s).
+    
+    Args:
+        allowed: State, or tuple of states, the method may run in
+        message: Error message raised from any other state
+        
+    Returns:
+        Callable: Decorator that raises ATMException outside the allowed states
+    """
+    states = (allowed,) if isinstance(allowed, ATMState) else allowed
+    mask = 0
+    for state in states:
+        mask |= state.flag
+    
+    def decorator(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self._state.flag & mask:
+                raise ATMException(message)
+            return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
 
 
 class ATMController:
@@ -35,6 +85,17 @@ class ATMController:
     and extensible for future integrations.
     """
     
+    __slots__ = (
+        '_bank_service', '_cash_dispenser', '_card_reader', '_state',
+        '_current_card', '_current_account', '_transaction_history',
+        '_history_snapshot', '_session_accounts', '_validation_cache',
+    )
+    
+    # Seconds a card validation result from the bank is reused
+    _VALIDATION_TTL = 2.0
+    # Most recent transactions kept in a session's history
+    _MAX_SESSION_TRANSACTIONS = 256
+    
     def __init__(self, bank_service: BankService, cash_dispenser: CashDispenser, 
                  card_reader: CardReader):
         """
@@ -51,12 +112,19 @@ class ATMController:
         self._state = ATMState.IDLE
         self._current_card: Optional[Card] = None
         self._current_account: Optional[Account] = None
-        self._transaction_history: List[Transaction] = []
+        self._transaction_history: Deque[Transaction] = deque(
+            maxlen=self._MAX_SESSION_TRANSACTIONS
+        )
+        self._history_snapshot: Optional[Tuple[Transaction, ...]] = None
+        self._session_accounts: Optional[List[Account]] = None
+        # card_number -> (is_valid, monotonic timestamp of validation)
+        self._validation_cache: Dict[str, Tuple[bool, float]] = {}
     
     def get_state(self) -> ATMState:
         """Get current ATM state."""
         return self._state
     
+    @require_state(ATMState.IDLE, _MSG_NOT_IDLE)
     def insert_card(self, card_number: str) -> bool:
         """
         Insert a card into the ATM.
@@ -71,12 +139,12 @@ class ATMController:
             InvalidCardException: If card is invalid
             ATMException: If ATM is not in idle state
         """
-        if self._state != ATMState.IDLE:
-            raise ATMException("ATM is not ready to accept a card")
+        if not is_well_formed_card_number(card_number):
+            raise InvalidCardException("Invalid card number")
         
         try:
             # Validate card with bank service
-            if not self._bank_service.validate_card(card_number):
+            if not self._validate_card_cached(card_number):
                 raise InvalidCardException("Invalid card")
             
             # Read card information
@@ -89,6 +157,7 @@ class ATMController:
             self._reset_session()
             raise e
     
+    @require_state(ATMState.CARD_INSERTED, _MSG_NO_CARD_INSERTED)
     def enter_pin(self, pin: str) -> bool:
         """
         Enter PIN for the inserted card.
@@ -103,17 +172,16 @@ class ATMController:
             InvalidPinException: If PIN is incorrect
             ATMException: If no card is inserted
         """
-        if self._state != ATMState.CARD_INSERTED:
-            raise ATMException("No card inserted or PIN already verified")
-        
         if not self._current_card:
-            raise ATMException("No card information available")
+            raise ATMException(_MSG_NO_CARD_INFO)
         
         try:
             # Verify PIN with bank service
             if not self._bank_service.verify_pin(self._current_card.card_number, pin):
                 raise InvalidPinException("Incorrect PIN")
             
+            self._invalidate_card_validation(self._current_card.card_number)
+            self._session_accounts = None
             self._state = ATMState.PIN_VERIFIED
             return True
             
@@ -121,6 +189,7 @@ class ATMController:
             self._reset_session()
             raise
     
+    @require_state(ATMState.PIN_VERIFIED, _MSG_PIN_NOT_VERIFIED)
     def get_accounts(self) -> List[Account]:
         """
         Get list of accounts associated with the current card.
@@ -131,14 +200,12 @@ class ATMController:
         Raises:
             ATMException: If PIN is not verified
         """
-        if self._state != ATMState.PIN_VERIFIED:
-            raise ATMException("PIN not verified")
-        
         if not self._current_card:
-            raise ATMException("No card information available")
+            raise ATMException(_MSG_NO_CARD_INFO)
         
-        return self._bank_service.get_accounts(self._current_card.card_number)
+        return list(self._get_session_accounts())
     
+    @require_state(ATMState.PIN_VERIFIED, _MSG_PIN_NOT_VERIFIED)
     def select_account(self, account_number: str) -> Account:
         """
         Select an account for transactions.
@@ -153,26 +220,24 @@ class ATMController:
             AccountNotFoundException: If account is not found
             ATMException: If PIN is not verified
         """
-        if self._state != ATMState.PIN_VERIFIED:
-            raise ATMException("PIN not verified")
-        
         if not self._current_card:
-            raise ATMException("No card information available")
-        
-        # Get account information from bank service
-        account = self._bank_service.get_account(account_number)
-        if not account:
-            raise AccountNotFoundException(f"Account {account_number} not found")
+            raise ATMException(_MSG_NO_CARD_INFO)
         
-        # Verify account belongs to this card
-        accounts = self._bank_service.get_accounts(self._current_card.card_number)
-        if account_number not in [acc.account_number for acc in accounts]:
-            raise AccountNotFoundException("Account does not belong to this card")
+        # Only accounts linked to this card can be selected
+        account = next(
+            (acc for acc in self._get_session_accounts() if acc.account_number == account_number),
+            None
+        )
+        if account is None:
+            raise AccountNotFoundException(
+                f"Account {account_number} not found for this card"
+            )
         
         self._current_account = account
         self._state = ATMState.ACCOUNT_SELECTED
         return account
     
+    @require_state(ATMState.ACCOUNT_SELECTED, _MSG_NO_ACCOUNT_SELECTED)
     def get_balance(self) -> int:
         """
         Get the current account balance.
@@ -183,17 +248,15 @@ class ATMController:
         Raises:
             ATMException: If no account is selected
         """
-        if self._state != ATMState.ACCOUNT_SELECTED:
-            raise ATMException("No account selected")
-        
         if not self._current_account:
-            raise ATMException("No account information available")
+            raise ATMException(_MSG_NO_ACCOUNT_INFO)
         
         # Get fresh balance from bank service
         balance = self._bank_service.get_balance(self._current_account.account_number)
         self._current_account.balance = balance
         return balance
     
+    @require_state(ATMState.ACCOUNT_SELECTED, _MSG_NO_ACCOUNT_SELECTED)
     def deposit(self, amount: int) -> Transaction:
         """
         Deposit money to the selected account.
@@ -207,11 +270,8 @@ class ATMController:
         Raises:
             ATMException: If no account is selected or invalid amount
         """
-        if self._state != ATMState.ACCOUNT_SELECTED:
-            raise ATMException("No account selected")
-        
         if not self._current_account:
-            raise ATMException("No account information available")
+            raise ATMException(_MSG_NO_ACCOUNT_INFO)
         
         if amount <= 0:
             raise ATMException("Deposit amount must be positive")
@@ -220,18 +280,19 @@ class ATMController:
         new_balance = self._bank_service.deposit(self._current_account.account_number, amount)
         
         # Create transaction record
-        transaction = Transaction(
+        transaction = Transaction.create(
             transaction_type=TransactionType.DEPOSIT,
             amount=amount,
             account_number=self._current_account.account_number,
             balance_after=new_balance
         )
         
-        self._transaction_history.append(transaction)
+        self._record_transaction(transaction)
         self._current_account.balance = new_balance
         
         return transaction
     
+    @require_state(ATMState.ACCOUNT_SELECTED, _MSG_NO_ACCOUNT_SELECTED)
     def withdraw(self, amount: int) -> Transaction:
         """
         Withdraw money from the selected account.
@@ -247,51 +308,91 @@ class ATMController:
             InsufficientCashException: If ATM has insufficient cash
             ATMException: If no account is selected or invalid amount
         """
-        if self._state != ATMState.ACCOUNT_SELECTED:
-            raise ATMException("No account selected")
-        
         if not self._current_account:
-            raise ATMException("No account information available")
+            raise ATMException(_MSG_NO_ACCOUNT_INFO)
         
         if amount <= 0:
             raise ATMException("Withdrawal amount must be positive")
         
-        # Check if ATM has sufficient cash
+        # Check ATM cash availability before touching the account
         if not self._cash_dispenser.has_sufficient_cash(amount):
             raise InsufficientCashException("ATM has insufficient cash")
         
-        # Check account balance
-        current_balance = self.get_balance()
-        if current_balance < amount:
-            raise InsufficientFundsException("Insufficient funds in account")
-        
-        # Process withdrawal through bank service
-        new_balance = self._bank_service.withdraw(self._current_account.account_number, amount)
+        # Process withdrawal through bank service, which raises
+        # InsufficientFundsException if the balance does not cover it
+        account_number = self._current_account.account_number
+        new_balance = self._bank_service.withdraw(account_number, amount)
         
-        # Dispense cash
-        self._cash_dispenser.dispense_cash(amount)
+        # Dispense cash, returning the money to the account if the cash ran
+        # out since the check above or the dispenser failed
+        try:
+            dispensed = self._cash_dispenser.try_dispense(amount)
+        except Exception as e:
+            self._refund_withdrawal(account_number, amount, e)
+            raise
+        if not dispensed:
+            error = InsufficientCashException("ATM has insufficient cash")
+            self._refund_withdrawal(account_number, amount, error)
+            raise error
         
         # Create transaction record
-        transaction = Transaction(
+        transaction = Transaction.create(
             transaction_type=TransactionType.WITHDRAWAL,
             amount=amount,
             account_number=self._current_account.account_number,
             balance_after=new_balance
         )
         
-        self._transaction_history.append(transaction)
+        self._record_transaction(transaction)
         self._current_account.balance = new_balance
         
         return transaction
     
-    def get_transaction_history(self) -> List[Transaction]:
+    def _refund_withdrawal(self, account_number: str, amount: int, cause: Exception) -> None:
+        """
+        Return a debited amount to the account after the cash could not be dispensed.
+        
+        Args:
+            account_number: Account that was debited
+            amount: Amount to return
+            cause: Error that stopped the cash from being dispensed
+            
+        Raises:
+            ATMException: If the bank service fails to return the amount
+        """
+        try:
+            self._bank_service.deposit(account_number, amount)
+        except Exception as e:
+            raise ATMException(
+                f"Failed to refund {amount} to account {account_number} "
+                f"after dispense error: {cause}"
+            ) from e
+    
+    def get_transaction_history(self) -> Sequence[Transaction]:
         """
         Get transaction history for current session.
         
+        Only the most recent transactions of a long session are kept. The
+        returned sequence is read-only and shared between calls until the
+        next transaction is recorded.
+        
+        Returns:
+            Sequence[Transaction]: Transactions performed in this session
+        """
+        if self._history_snapshot is None:
+            self._history_snapshot = tuple(self._transaction_history)
+        return self._history_snapshot
+    
+    def iter_transaction_history(self) -> Iterator[Transaction]:
+        """
+        Iterate over the transaction history for current session without copying it.
+        
+        The iterator must be consumed before the next transaction is recorded.
+        
         Returns:
-            List[Transaction]: List of transactions performed in this session
+            Iterator[Transaction]: Transactions performed in this session, oldest first
         """
-        return self._transaction_history.copy()
+        return iter(self._transaction_history)
     
     def eject_card(self) -> bool:
         """
@@ -302,13 +403,69 @@ class ATMController:
         """
         if self._current_card:
             self._card_reader.eject_card()
+            self._invalidate_card_validation(self._current_card.card_number)
         
         self._reset_session()
         return True
     
+    def _record_transaction(self, transaction: Transaction):
+        """Append a transaction to the session history."""
+        self._transaction_history.append(transaction)
+        self._history_snapshot = None
+    
+    def _get_session_accounts(self) -> List[Account]:
+        """
+        Get the accounts linked to the current card, fetching them on first use.
+        
+        The result is kept until the session is reset.
+        
+        Returns:
+            List[Account]: Accounts linked to the current card
+        """
+        if self._session_accounts is None:
+            self._session_accounts = self._bank_service.get_accounts(
+                self._current_card.card_number
+            )
+        return self._session_accounts
+    
+    def _validate_card_cached(self, card_number: str) -> bool:
+        """
+        Validate a card, reusing a recent bank result if one is available.
+        
+        Args:
+            card_number: The card number to validate
+            
+        Returns:
+            bool: True if card is valid and active
+        """
+        now = monotonic()
+        cached = self._validation_cache.get(card_number)
+        if cached is not None and now - cached[1] < self._VALIDATION_TTL:
+            return cached[0]
+        
+        is_valid = self._bank_service.validate_card(card_number)
+        
+        # Entries are kept oldest first, so expired ones are pruned from the front
+        cache = self._validation_cache
+        cache.pop(card_number, None)
+        while cache:
+            oldest = next(iter(cache))
+            if now - cache[oldest][1] < self._VALIDATION_TTL:
+                break
+            del cache[oldest]
+        
+        self._validation_cache[card_number] = (is_valid, now)
+        return is_valid
+    
+    def _invalidate_card_validation(self, card_number: str):
+        """Drop any cached validation result for a card."""
+        self._validation_cache.pop(card_number, None)
+    
     def _reset_session(self):
         """Reset ATM session to idle state."""
         self._state = ATMState.IDLE
         self._current_card = None
         self._current_account = None
-        self._transaction_history = []
\ No newline at end of file
+        self._transaction_history = deque(maxlen=self._MAX_SESSION_TRANSACTIONS)
+        self._history_snapshot = None
+        self._session_accounts = None
\ No newline at end of file
@@ -2,7 +2,7 @@
 Bank Service Interface - Defines the contract for bank operations
 """
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Any, List, Optional, Sequence, Tuple
 from models.account import Account
 
 
@@ -13,6 +13,16 @@ class BankService(ABC):
     This interface defines the contract for communicating with bank systems.
     Implementations can connect to real bank APIs or provide mock services for testing.
     """
+    __slots__ = ()
+    
+    # Largest number of operations accepted by a single batch() call
+    MAX_BATCH_SIZE = 20
+    
+    # Read-only operations that may be sent through batch(). Deposits and
+    # withdrawals are excluded so a failed batch never leaves money moved.
+    BATCHABLE_OPERATIONS = frozenset({
+        "validate_card", "verify_pin", "get_accounts", "get_account", "get_balance",
+    })
     
     @abstractmethod
     def validate_card(self, card_number: str) -> bool:
@@ -109,4 +119,32 @@ class BankService(ABC):
         Raises:
             InsufficientFundsException: If account has insufficient funds
         """
-        pass
\ No newline at end of file
+        pass
+    
+    def batch(self, ops: Sequence[Tuple[str, tuple]]) -> List[Any]:
+        """
+        Run several bank operations in one request.
+        
+        Implementations backed by a remote bank should override this to send
+        the operations in a single round-trip. The default runs them one by one.
+        Only read-only operations are accepted, so if one fails its exception
+        propagates and the results of the earlier ones are simply discarded.
+        
+        Args:
+            ops: Sequence of (operation name, arguments) pairs
+            
+        Returns:
+            List[Any]: Result of each operation, in the same order as ops
+            
+        Raises:
+            ValueError: If there are too many operations or one is not batchable
+            Exception: Whatever the first failing operation raises
+        """
+        if len(ops) > self.MAX_BATCH_SIZE:
+            raise ValueError(f"Batch exceeds {self.MAX_BATCH_SIZE} operations")
+        
+        for name, _ in ops:
+            if name not in self.BATCHABLE_OPERATIONS:
+                raise ValueError(f"Operation {name!r} cannot be batched")
+        
+        return [getattr(self, name)(*args) for name, args in ops]
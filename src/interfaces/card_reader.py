@@ -12,6 +12,7 @@ class CardReader(ABC):
     This interface defines the contract for interacting with ATM card reading hardware.
     Implementations can connect to real hardware or provide mock services for testing.
     """
+    __slots__ = ()
     
     @abstractmethod
     def read_card(self, card_number: str) -> Card:
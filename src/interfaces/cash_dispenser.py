@@ -2,6 +2,7 @@
 Cash Dispenser Interface - Defines the contract for cash dispensing operations
 """
 from abc import ABC, abstractmethod
+from exceptions.atm_exceptions import InsufficientCashException
 
 
 class CashDispenser(ABC):
@@ -11,6 +12,7 @@ class CashDispenser(ABC):
     This interface defines the contract for interacting with ATM cash dispensing hardware.
     Implementations can connect to real hardware or provide mock services for testing.
     """
+    __slots__ = ()
     
     @abstractmethod
     def has_sufficient_cash(self, amount: int) -> bool:
@@ -41,6 +43,26 @@ class CashDispenser(ABC):
         """
         pass
     
+    def try_dispense(self, amount: int) -> bool:
+        """
+        Dispense the specified amount of cash if enough is available.
+        
+        Implementations backed by hardware should override this to check and
+        dispense in a single operation.
+        
+        Args:
+            amount: Amount to dispense
+            
+        Returns:
+            bool: True if cash was dispensed, False if insufficient cash is available
+        """
+        if not self.has_sufficient_cash(amount):
+            return False
+        try:
+            return self.dispense_cash(amount)
+        except InsufficientCashException:
+            return False
+    
     @abstractmethod
     def get_available_cash(self) -> int:
         """
@@ -1,28 +1,40 @@
 """
 Mock Bank Service - Test implementation of BankService interface
 """
-from typing import List, Optional, Dict
+import hashlib
+import hmac
+from typing import List, Optional, Dict, Tuple
 from interfaces.bank_service import BankService
 from models.account import Account, AccountType
+from models.card import is_well_formed_card_number
 from exceptions.atm_exceptions import InsufficientFundsException
 
 
+def _hash_pin(pin: str) -> bytes:
+    """Hash a PIN for storage and comparison."""
+    return hashlib.sha256(pin.encode()).digest()
+
+
+class _CardRecord:
+    """Stored card data: hashed PIN, active flag and linked accounts."""
+    __slots__ = ('pin_hash', 'active', 'accounts')
+    
+    def __init__(self, pin: str, active: bool, accounts: Tuple[Account, ...] = ()):
+        self.pin_hash = _hash_pin(pin)
+        self.active = active
+        self.accounts = accounts
+
+
 class MockBankService(BankService):
     """
     Mock implementation of BankService for testing purposes.
     
     This class simulates bank operations without requiring external connections.
     """
+    __slots__ = ('_card_records', '_accounts')
     
     def __init__(self):
         """Initialize mock bank service with test data."""
-        # Mock card database: card_number -> (pin, is_valid)
-        self._cards = {
-            "1234567890123456": ("1234", True),
-            "2345678901234567": ("5678", True),
-            "3456789012345678": ("9999", False),  # Invalid card
-        }
-        
         # Mock account database: account_number -> Account
         self._accounts = {
             "1001": Account(
@@ -45,33 +57,37 @@ class MockBankService(BankService):
             ),
         }
         
-        # Mock card-to-accounts mapping
-        self._card_accounts = {
-            "1234567890123456": ["1001", "1002"],
-            "2345678901234567": ["2001"],
+        # Mock card database: card_number -> _CardRecord
+        self._card_records: Dict[str, _CardRecord] = {
+            "1234567890123456": _CardRecord(
+                "1234", True, self._resolve_accounts(["1001", "1002"])
+            ),
+            "2345678901234567": _CardRecord(
+                "5678", True, self._resolve_accounts(["2001"])
+            ),
+            "3456789012345678": _CardRecord("9999", False),  # Invalid card
         }
     
     def validate_card(self, card_number: str) -> bool:
         """Validate if a card is valid and active."""
-        card_info = self._cards.get(card_number)
-        return card_info is not None and card_info[1]
+        if not is_well_formed_card_number(card_number):
+            return False
+        record = self._card_records.get(card_number)
+        return record is not None and record.active
     
     def verify_pin(self, card_number: str, pin: str) -> bool:
         """Verify the PIN for a given card."""
-        card_info = self._cards.get(card_number)
-        if not card_info or not card_info[1]:  # Invalid or inactive card
+        if not is_well_formed_card_number(card_number):
             return False
-        return card_info[0] == pin
+        record = self._card_records.get(card_number)
+        if record is None or not record.active:  # Invalid or inactive card
+            return False
+        return hmac.compare_digest(record.pin_hash, _hash_pin(pin))
     
     def get_accounts(self, card_number: str) -> List[Account]:
         """Get all accounts associated with a card."""
-        account_numbers = self._card_accounts.get(card_number, [])
-        accounts = []
-        for account_num in account_numbers:
-            account = self._accounts.get(account_num)
-            if account:
-                accounts.append(account)
-        return accounts
+        record = self._card_records.get(card_number)
+        return list(record.accounts) if record is not None else []
     
     def get_account(self, account_number: str) -> Optional[Account]:
         """Get account information by account number."""
@@ -112,13 +128,36 @@ class MockBankService(BankService):
         return account.balance
     
     def add_test_card(self, card_number: str, pin: str, account_numbers: List[str]):
-        """Add a test card for testing purposes."""
-        self._cards[card_number] = (pin, True)
-        self._card_accounts[card_number] = account_numbers
+        """
+        Add a test card for testing purposes.
+        
+        Accounts are linked when the card is added, so they must already exist.
+        
+        Raises:
+            KeyError: If an account number is unknown
+        """
+        self._card_records[card_number] = _CardRecord(
+            pin, True, self._resolve_accounts(account_numbers)
+        )
     
     def add_test_account(self, account: Account):
-        """Add a test account for testing purposes."""
+        """
+        Add a test account for testing purposes.
+        
+        Cards linked to an account with the same number are re-linked to this one.
+        """
+        previous = self._accounts.get(account.account_number)
         self._accounts[account.account_number] = account
+        if previous is None:
+            return
+        for record in self._card_records.values():
+            record.accounts = tuple(
+                account if linked is previous else linked for linked in record.accounts
+            )
+    
+    def _resolve_accounts(self, account_numbers: List[str]) -> Tuple[Account, ...]:
+        """Look up the accounts for a list of account numbers, raising KeyError if one is unknown."""
+        return tuple(self._accounts[num] for num in account_numbers)
     
     def reset_accounts(self):
         """Reset all account balances to their initial values."""
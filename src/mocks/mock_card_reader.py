@@ -2,8 +2,9 @@
 Mock Card Reader - Test implementation of CardReader interface
 """
 from datetime import datetime, timedelta
+from typing import Dict, Optional
 from interfaces.card_reader import CardReader
-from models.card import Card
+from models.card import Card, is_well_formed_card_number
 from exceptions.atm_exceptions import InvalidCardException
 
 
@@ -13,30 +14,37 @@ class MockCardReader(CardReader):
     
     This class simulates card reading operations without requiring hardware.
     """
+    __slots__ = ('_card_inserted', '_current_card', '_card_info')
+    
+    # Default test cards: card_number -> (holder_name, days until expiry, card_type)
+    _DEFAULT_CARD_INFO_SPEC = {
+        "1234567890123456": ("John Doe", 365, "DEBIT"),
+        "2345678901234567": ("Jane Smith", 730, "CREDIT"),
+        "3456789012345678": ("Invalid User", -30, "DEBIT"),  # Expired
+    }
     
     def __init__(self):
         """Initialize mock card reader."""
         self._card_inserted = False
         self._current_card = None
         
-        # Mock card database for card information
-        self._card_info = {
-            "1234567890123456": {
-                "holder_name": "John Doe",
-                "expiry_date": datetime.now() + timedelta(days=365),
-                "card_type": "DEBIT"
-            },
-            "2345678901234567": {
-                "holder_name": "Jane Smith",
-                "expiry_date": datetime.now() + timedelta(days=730),
-                "card_type": "CREDIT"
-            },
-            "3456789012345678": {
-                "holder_name": "Invalid User",
-                "expiry_date": datetime.now() - timedelta(days=30),  # Expired
-                "card_type": "DEBIT"
-            },
-        }
+        # Mock card database for card information, built on first use
+        self._card_info: Optional[Dict[str, dict]] = None
+    
+    def _get_card_info(self) -> Dict[str, dict]:
+        """Get the card database, building the default cards on first use."""
+        if self._card_info is None:
+            now = datetime.now()
+            self._card_info = {
+                card_number: {
+                    "holder_name": holder_name,
+                    "expiry_date": now + timedelta(days=days),
+                    "card_type": card_type
+                }
+                for card_number, (holder_name, days, card_type)
+                in self._DEFAULT_CARD_INFO_SPEC.items()
+            }
+        return self._card_info
     
     def read_card(self, card_number: str) -> Card:
         """
@@ -54,10 +62,17 @@ class MockCardReader(CardReader):
         if not card_number:
             raise InvalidCardException("No card number provided")
         
-        card_info = self._card_info.get(card_number)
+        if not is_well_formed_card_number(card_number):
+            raise InvalidCardException("Invalid card number")
+        
+        card_info = self._get_card_info().get(card_number)
         if not card_info:
             raise InvalidCardException("Card not recognized")
         
+        # Check expiry before building the card
+        if card_info["expiry_date"] < datetime.now():
+            raise InvalidCardException("Card is expired")
+        
         try:
             card = Card(
                 card_number=card_number,
@@ -66,10 +81,6 @@ class MockCardReader(CardReader):
                 card_type=card_info["card_type"]
             )
             
-            # Check if card is expired or inactive
-            if card.is_expired():
-                raise InvalidCardException("Card is expired")
-            
             self._card_inserted = True
             self._current_card = card
             return card
@@ -107,7 +118,7 @@ class MockCardReader(CardReader):
         if expiry_date is None:
             expiry_date = datetime.now() + timedelta(days=365)
         
-        self._card_info[card_number] = {
+        self._get_card_info()[card_number] = {
             "holder_name": holder_name,
             "expiry_date": expiry_date,
             "card_type": card_type
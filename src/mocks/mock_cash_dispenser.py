@@ -1,10 +1,17 @@
 """
 Mock Cash Dispenser - Test implementation of CashDispenser interface
 """
+from threading import Lock
 from interfaces.cash_dispenser import CashDispenser
 from exceptions.atm_exceptions import InsufficientCashException
 
 
+# Outcomes of MockCashDispenser._dispense
+_DISPENSED = 0
+_INVALID_AMOUNT = -1
+_INSUFFICIENT_CASH = -2
+
+
 class MockCashDispenser(CashDispenser):
     """
     Mock implementation of CashDispenser for testing purposes.
@@ -21,6 +28,7 @@ class MockCashDispenser(CashDispenser):
         """
         self._available_cash = initial_cash
         self._total_dispensed = 0
+        self._lock = Lock()
     
     def has_sufficient_cash(self, amount: int) -> bool:
         """Check if the ATM has sufficient cash for withdrawal."""
@@ -39,19 +47,56 @@ class MockCashDispenser(CashDispenser):
         Raises:
             InsufficientCashException: If insufficient cash is available
         """
-        if amount <= 0:
+        status = self._dispense(amount)
+        if status == _INVALID_AMOUNT:
             raise ValueError("Dispense amount must be positive")
         
-        if not self.has_sufficient_cash(amount):
+        if status == _INSUFFICIENT_CASH:
             raise InsufficientCashException(
                 f"Insufficient cash in ATM. Available: ${self._available_cash}, "
                 f"Requested: ${amount}"
             )
         
-        self._available_cash -= amount
-        self._total_dispensed += amount
         return True
     
+    def try_dispense(self, amount: int) -> bool:
+        """
+        Dispense the specified amount of cash if enough is available.
+        
+        Args:
+            amount: Amount to dispense
+            
+        Returns:
+            bool: True if cash was dispensed, False if insufficient cash is available
+        """
+        status = self._dispense(amount)
+        if status == _INVALID_AMOUNT:
+            raise ValueError("Dispense amount must be positive")
+        
+        return status == _DISPENSED
+    
+    def _dispense(self, amount: int) -> int:
+        """
+        Check and debit the requested cash without raising.
+        
+        Args:
+            amount: Amount to dispense
+            
+        Returns:
+            int: _DISPENSED, _INVALID_AMOUNT or _INSUFFICIENT_CASH
+        """
+        if amount <= 0:
+            return _INVALID_AMOUNT
+        
+        # Check and debit under one lock so concurrent withdrawals cannot overdraw
+        with self._lock:
+            if self._available_cash < amount:
+                return _INSUFFICIENT_CASH
+            
+            self._available_cash -= amount
+            self._total_dispensed += amount
+        return _DISPENSED
+    
     def get_available_cash(self) -> int:
         """Get the total amount of cash available in the ATM."""
         return self._available_cash
@@ -69,7 +114,8 @@ class MockCashDispenser(CashDispenser):
         if amount <= 0:
             raise ValueError("Refill amount must be positive")
         
-        self._available_cash += amount
+        with self._lock:
+            self._available_cash += amount
         return True
     
     def get_total_dispensed(self) -> int:
@@ -78,5 +124,6 @@ class MockCashDispenser(CashDispenser):
     
     def reset(self, cash_amount: int = 10000):
         """Reset the cash dispenser to initial state."""
-        self._available_cash = cash_amount
-        self._total_dispensed = 0
\ No newline at end of file
+        with self._lock:
+            self._available_cash = cash_amount
+            self._total_dispensed = 0
\ No newline at end of file
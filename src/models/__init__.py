@@ -1,5 +1,5 @@
 """Data models for ATM entities"""
 
 from .account import Account, AccountType
-from .card import Card
+from .card import Card, CARD_NUMBER_LENGTH, is_well_formed_card_number
 from .transaction import Transaction, TransactionType
\ No newline at end of file
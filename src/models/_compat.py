@@ -0,0 +1,8 @@
+"""
+Compatibility helpers for the data models
+"""
+import sys
+
+
+# Keyword arguments enabling dataclass(slots=True), which needs Python 3.10+
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
@@ -1,9 +1,10 @@
 """
 Account Model - Represents a bank account
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Optional
+from ._compat import DATACLASS_SLOTS
 
 
 class AccountType(Enum):
@@ -13,7 +14,16 @@ class AccountType(Enum):
     CREDIT = "credit"
 
 
-@dataclass
+# Daily withdrawal limit used when an account does not specify one
+_DEFAULT_LIMIT = 300
+_DEFAULT_LIMITS = {
+    AccountType.CHECKING: 1000,
+    AccountType.SAVINGS: 500,
+    AccountType.CREDIT: _DEFAULT_LIMIT,
+}
+
+
+@dataclass(**DATACLASS_SLOTS)
 class Account:
     """
     Represents a bank account with basic information.
@@ -24,6 +34,18 @@ class Account:
     account_name: str
     is_active: bool = True
     daily_withdrawal_limit: Optional[int] = None
+    # Masked account number, computed once for display
+    _masked: str = field(init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name: str, value) -> None:
+        """Set a field, recomputing the cached mask when the account number changes."""
+        object.__setattr__(self, name, value)
+        if name == "account_number" and value:
+            if len(value) < 4:
+                masked = "*" * len(value)
+            else:
+                masked = "*" * (len(value) - 4) + value[-4:]
+            object.__setattr__(self, "_masked", masked)
     
     def __post_init__(self):
         """Validate account data after initialization."""
@@ -35,12 +57,7 @@ class Account:
         
         # Set default daily withdrawal limit if not specified
         if self.daily_withdrawal_limit is None:
-            if self.account_type == AccountType.CHECKING:
-                self.daily_withdrawal_limit = 1000
-            elif self.account_type == AccountType.SAVINGS:
-                self.daily_withdrawal_limit = 500
-            else:  # CREDIT
-                self.daily_withdrawal_limit = 300
+            self.daily_withdrawal_limit = _DEFAULT_LIMITS.get(self.account_type, _DEFAULT_LIMIT)
     
     def can_withdraw(self, amount: int) -> bool:
         """
@@ -62,7 +79,7 @@ class Account:
             return False
         
         # For credit accounts, balance can be negative up to credit limit
-        if self.account_type == AccountType.CREDIT:
+        if self.account_type is AccountType.CREDIT:
             # Assuming negative balance represents available credit
             return True
         
@@ -70,6 +87,4 @@ class Account:
     
     def mask_account_number(self) -> str:
         """Return masked account number for display purposes."""
-        if len(self.account_number) < 4:
-            return "*" * len(self.account_number)
-        return "*" * (len(self.account_number) - 4) + self.account_number[-4:]
\ No newline at end of file
+        return self._masked
\ No newline at end of file
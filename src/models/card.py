@@ -1,12 +1,38 @@
 """
 Card Model - Represents a bank card
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
+import re
+import time
+from ._compat import DATACLASS_SLOTS
 
 
-@dataclass
+# Number of digits on a supported card
+CARD_NUMBER_LENGTH = 16
+
+# Card numbers accepted everywhere: exactly CARD_NUMBER_LENGTH ASCII digits
+_CARD_NUMBER_RE = re.compile(f"[0-9]{{{CARD_NUMBER_LENGTH}}}")
+
+
+def is_well_formed_card_number(card_number: str) -> bool:
+    """
+    Check that a card number has the expected length and only ASCII digits.
+    
+    This is a cheap format check meant to reject misreads before any lookup;
+    it does not say whether the card exists or is active.
+    
+    Args:
+        card_number: The card number to check
+        
+    Returns:
+        bool: True if the card number is well formed
+    """
+    return bool(card_number) and _CARD_NUMBER_RE.fullmatch(card_number) is not None
+
+
+@dataclass(**DATACLASS_SLOTS)
 class Card:
     """
     Represents a bank card with basic information.
@@ -16,24 +42,38 @@ class Card:
     expiry_date: datetime
     card_type: str = "DEBIT"  # DEBIT, CREDIT, etc.
     is_active: bool = True
+    # Expiry as a Unix timestamp, so expiry checks are a float comparison
+    _expiry_ts: float = field(init=False, repr=False, compare=False)
+    # Masked card number, computed once for display
+    _masked: str = field(init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name: str, value) -> None:
+        """Set a field, recomputing the cached values derived from it."""
+        object.__setattr__(self, name, value)
+        if name == "expiry_date":
+            object.__setattr__(self, "_expiry_ts", value.timestamp())
+        elif name == "card_number" and value:
+            if len(value) < 4:
+                masked = "*" * len(value)
+            else:
+                masked = "*" * (len(value) - 4) + value[-4:]
+            object.__setattr__(self, "_masked", masked)
     
     def __post_init__(self):
         """Validate card data after initialization."""
-        if not self.card_number or len(self.card_number) < 12:
+        if not _CARD_NUMBER_RE.fullmatch(self.card_number):
             raise ValueError("Invalid card number")
         
         if not self.holder_name:
             raise ValueError("Cardholder name is required")
         
-        if self.expiry_date < datetime.now():
+        if self._expiry_ts < time.time():
             self.is_active = False
     
     def is_expired(self) -> bool:
         """Check if the card is expired."""
-        return datetime.now() > self.expiry_date
+        return time.time() > self._expiry_ts
     
     def mask_card_number(self) -> str:
         """Return masked card number for display purposes."""
-        if len(self.card_number) < 4:
-            return "*" * len(self.card_number)
-        return "*" * (len(self.card_number) - 4) + self.card_number[-4:]
\ No newline at end of file
+        return self._masked
\ No newline at end of file
@@ -1,10 +1,54 @@
 """
 Transaction Model - Represents a transaction record
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-import uuid
+from threading import Lock
+from typing import Optional, Tuple
+import os
+import time
+from ._compat import DATACLASS_SLOTS
+
+
+# Transaction ids are ULIDs: 48-bit millisecond timestamp followed by 80 random
+# bits, written as 26 Crockford base32 characters so ids sort by creation time
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_ULID_RANDOM_MAX = (1 << 80) - 1
+_ulid_last_ms = -1
+_ulid_last_random = 0
+_ulid_lock = Lock()
+
+
+def _new_ulid() -> Tuple[str, int]:
+    """
+    Generate a ULID that sorts after every ULID previously made in this process.
+    
+    Within the same millisecond the random part is incremented.
+    
+    Returns:
+        Tuple[str, int]: The ULID and its millisecond Unix timestamp
+    """
+    global _ulid_last_ms, _ulid_last_random
+    with _ulid_lock:
+        ms = time.time_ns() // 1_000_000
+        if ms <= _ulid_last_ms:
+            ms = _ulid_last_ms
+            if _ulid_last_random == _ULID_RANDOM_MAX:
+                ms += 1
+                _ulid_last_random = int.from_bytes(os.urandom(10), "big")
+            else:
+                _ulid_last_random += 1
+        else:
+            _ulid_last_random = int.from_bytes(os.urandom(10), "big")
+        _ulid_last_ms = ms
+        value = (ms << 80) | _ulid_last_random
+    
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD[value & 0x1F])
+        value >>= 5
+    return "".join(reversed(chars)), ms
 
 
 class TransactionType(Enum):
@@ -14,25 +58,65 @@ class TransactionType(Enum):
     BALANCE_INQUIRY = "balance_inquiry"
 
 
-@dataclass
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class Transaction:
     """
     Represents a transaction with all relevant details.
+    
+    Transactions are immutable records once created.
     """
     transaction_type: TransactionType
     amount: int
     account_number: str
     balance_after: int
-    transaction_id: str = None
-    timestamp: datetime = None
+    transaction_id: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    # String form, built on first str() call
+    _str_cache: Optional[str] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         """Initialize transaction with default values."""
+        # Fields of a frozen dataclass can only be filled in through object.__setattr__
         if self.transaction_id is None:
-            self.transaction_id = str(uuid.uuid4())
+            transaction_id, ms = _new_ulid()
+            object.__setattr__(self, "transaction_id", transaction_id)
+            
+            # Reuse the ULID's clock reading for the timestamp
+            if self.timestamp is None:
+                object.__setattr__(self, "timestamp", datetime.fromtimestamp(ms / 1000))
         
         if self.timestamp is None:
-            self.timestamp = datetime.now()
+            object.__setattr__(self, "timestamp", datetime.now())
+    
+    @classmethod
+    def create(cls, transaction_type: TransactionType, amount: int,
+               account_number: str, balance_after: int) -> "Transaction":
+        """
+        Create a transaction with a new id and timestamp.
+        
+        Equivalent to calling the constructor without transaction_id and
+        timestamp, but skips the generated __init__ and its default checks.
+        
+        Args:
+            transaction_type: Type of the transaction
+            amount: Transaction amount
+            account_number: Account the transaction applies to
+            balance_after: Account balance after the transaction
+            
+        Returns:
+            Transaction: The new transaction record
+        """
+        transaction_id, ms = _new_ulid()
+        transaction = object.__new__(cls)
+        set_field = object.__setattr__
+        set_field(transaction, "transaction_type", transaction_type)
+        set_field(transaction, "amount", amount)
+        set_field(transaction, "account_number", account_number)
+        set_field(transaction, "balance_after", balance_after)
+        set_field(transaction, "transaction_id", transaction_id)
+        set_field(transaction, "timestamp", datetime.fromtimestamp(ms / 1000))
+        set_field(transaction, "_str_cache", None)
+        return transaction
     
     def to_dict(self) -> dict:
         """Convert transaction to dictionary for serialization."""
@@ -47,6 +131,10 @@ class Transaction:
     
     def __str__(self) -> str:
         """String representation of transaction."""
-        return (f"Transaction {self.transaction_id}: "
+        if self._str_cache is None:
+            object.__setattr__(self, "_str_cache", (
+                f"Transaction {self.transaction_id}: "
                 f"{self.transaction_type.value.title()} ${self.amount} "
-                f"on {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
\ No newline at end of file
+                f"on {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
+            ))
+        return self._str_cache
\ No newline at end of file
@@ -8,22 +8,85 @@ import pytest
 from datetime import datetime, timedelta
 import sys
 import os
+import threading
 
 # Add src directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+import atm_controller as atm_controller_module
 from atm_controller import ATMController, ATMState
 from models.account import Account, AccountType
-from models.transaction import TransactionType
+from models.card import Card
+from models.transaction import Transaction, TransactionType
 from mocks.mock_bank_service import MockBankService
 from mocks.mock_cash_dispenser import MockCashDispenser
 from mocks.mock_card_reader import MockCardReader
+from interfaces.cash_dispenser import CashDispenser
 from exceptions.atm_exceptions import (
     InvalidCardException, InvalidPinException, InsufficientFundsException,
     InsufficientCashException, AccountNotFoundException, ATMException
 )
 
 
+def count_calls(monkeypatch, cls, method_name):
+    """Wrap a method on a class and record the arguments of every call."""
+    calls = []
+    original = getattr(cls, method_name)
+    
+    def wrapper(self, *args, **kwargs):
+        calls.append(args)
+        return original(self, *args, **kwargs)
+    
+    monkeypatch.setattr(cls, method_name, wrapper)
+    return calls
+
+
+class FaultyCashDispenser(CashDispenser):
+    """Cash dispenser that reports enough cash but fails when dispensing."""
+    __slots__ = ("_error",)
+    
+    def __init__(self, error: Exception):
+        self._error = error
+    
+    def has_sufficient_cash(self, amount: int) -> bool:
+        return True
+    
+    def dispense_cash(self, amount: int) -> bool:
+        raise self._error
+    
+    def get_available_cash(self) -> int:
+        return 5000
+    
+    def refill_cash(self, amount: int) -> bool:
+        return True
+
+
+class RacingCashDispenser(MockCashDispenser):
+    """
+    Cash dispenser whose cash reads wait for a second concurrent reader.
+    
+    Two unsynchronised dispenses therefore both read the balance before either
+    debits it. If a lock keeps the second thread out, the wait times out and
+    every later read goes straight through.
+    """
+    
+    def __init__(self, initial_cash: int):
+        self._barrier = threading.Barrier(2, timeout=0.2)
+        super().__init__(initial_cash)
+    
+    @property
+    def _available_cash(self) -> int:
+        try:
+            self._barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        return self._cash
+    
+    @_available_cash.setter
+    def _available_cash(self, value: int):
+        self._cash = value
+
+
 class TestATMController:
     """Test cases for ATM Controller functionality."""
     
@@ -37,11 +100,11 @@ class TestATMController:
     
     @pytest.fixture
     def reset_mocks(self, atm_controller):
-        """Reset mock services to initial state before each test."""
-        atm_controller._bank_service.reset_accounts()
-        atm_controller._cash_dispenser.reset(5000)
-        atm_controller._card_reader.eject_card()
-        atm_controller._reset_session()
+        """
+        Provide an ATM controller whose mock services are in their initial state.
+        
+        atm_controller builds fresh mocks for every test, so nothing needs resetting.
+        """
         yield atm_controller
     
     def test_initial_state(self, atm_controller):
@@ -51,6 +114,14 @@ class TestATMController:
         assert atm_controller._current_account is None
         assert len(atm_controller.get_transaction_history()) == 0
     
+    def test_state_values(self):
+        """Test states keep their string values and carry distinct bit flags."""
+        assert ATMState.IDLE.value == "idle"
+        assert ATMState("account_selected") is ATMState.ACCOUNT_SELECTED
+        allowed = ATMState.PIN_VERIFIED.flag | ATMState.ACCOUNT_SELECTED.flag
+        assert ATMState.PIN_VERIFIED.flag & allowed
+        assert not ATMState.IDLE.flag & allowed
+    
     def test_insert_valid_card(self, reset_mocks):
         """Test inserting a valid card."""
         atm = reset_mocks
@@ -71,6 +142,19 @@ class TestATMController:
         assert atm.get_state() == ATMState.IDLE
         assert atm._current_card is None
     
+    def test_insert_malformed_card_number(self, reset_mocks, monkeypatch):
+        """Test malformed card numbers are rejected without a bank lookup."""
+        atm = reset_mocks
+        calls = count_calls(monkeypatch, MockBankService, "validate_card")
+        
+        for card_number in ("", "123456789012345", "12345678901234567", "12345678901234ab",
+                            "123456789012345\u00b2", "\uff11" * 16):
+            with pytest.raises(InvalidCardException):
+                atm.insert_card(card_number)
+        
+        assert len(calls) == 0
+        assert atm.get_state() == ATMState.IDLE
+    
     def test_insert_card_wrong_state(self, reset_mocks):
         """Test inserting card when ATM is not in idle state."""
         atm = reset_mocks
@@ -79,6 +163,34 @@ class TestATMController:
         with pytest.raises(ATMException):
             atm.insert_card("2345678901234567")
     
+    def test_insert_invalid_card_reuses_validation(self, reset_mocks, monkeypatch):
+        """Test repeated insertion of an invalid card hits the bank once."""
+        atm = reset_mocks
+        calls = count_calls(monkeypatch, MockBankService, "validate_card")
+        
+        for _ in range(2):
+            with pytest.raises(InvalidCardException):
+                atm.insert_card("3456789012345678")
+        
+        assert len(calls) == 1
+    
+    def test_validation_cache_drops_expired_entries(self, reset_mocks, monkeypatch):
+        """Test failed insertions do not accumulate cached validations."""
+        atm = reset_mocks
+        clock = [0.0]
+        monkeypatch.setattr(atm_controller_module, "monotonic", lambda: clock[0])
+        
+        for i in range(50):
+            with pytest.raises(InvalidCardException):
+                atm.insert_card(f"{9000000000000000 + i}")
+        assert len(atm._validation_cache) == 50
+        
+        clock[0] += ATMController._VALIDATION_TTL
+        with pytest.raises(InvalidCardException):
+            atm.insert_card("3456789012345678")
+        
+        assert list(atm._validation_cache) == ["3456789012345678"]
+    
     def test_enter_correct_pin(self, reset_mocks):
         """Test entering correct PIN."""
         atm = reset_mocks
@@ -157,6 +269,28 @@ class TestATMController:
         with pytest.raises(AccountNotFoundException):
             atm.select_account("2001")  # Account belongs to different card
     
+    def test_session_fetches_accounts_once(self, reset_mocks, monkeypatch):
+        """Test listing and selecting accounts share one bank lookup."""
+        atm = reset_mocks
+        calls = count_calls(monkeypatch, MockBankService, "get_accounts")
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        
+        atm.get_accounts()
+        atm.select_account("1002")
+        
+        assert len(calls) == 1
+    
+    def test_accounts_fetched_lazily(self, reset_mocks, monkeypatch):
+        """Test accounts are not fetched until they are first needed."""
+        atm = reset_mocks
+        calls = count_calls(monkeypatch, MockBankService, "get_accounts")
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.eject_card()
+        
+        assert len(calls) == 0
+    
     def test_get_balance(self, reset_mocks):
         """Test getting account balance."""
         atm = reset_mocks
@@ -239,6 +373,21 @@ class TestATMController:
         with pytest.raises(InsufficientFundsException):
             atm.withdraw(1500)  # More than balance
     
+    def test_withdraw_skips_balance_lookup(self, reset_mocks, monkeypatch):
+        """Test withdrawal relies on the bank's own funds check."""
+        atm = reset_mocks
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+        calls = count_calls(monkeypatch, MockBankService, "get_balance")
+        
+        atm.withdraw(200)  # Balance: 800
+        with pytest.raises(InsufficientFundsException) as exc_info:
+            atm.withdraw(900)
+        
+        assert exc_info.value.__context__ is None  # Bank's exception is not re-wrapped
+        assert len(calls) == 0
+    
     def test_withdraw_insufficient_cash(self, reset_mocks):
         """Test withdrawal when ATM has insufficient cash."""
         atm = reset_mocks
@@ -250,6 +399,145 @@ class TestATMController:
         with pytest.raises(InsufficientCashException):
             atm.withdraw(200)  # More than ATM cash
     
+    def test_withdraw_insufficient_cash_keeps_balance(self, reset_mocks):
+        """Test a withdrawal the ATM cannot cover leaves the account untouched."""
+        atm = reset_mocks
+        atm._cash_dispenser.reset(100)
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+        
+        with pytest.raises(InsufficientCashException):
+            atm.withdraw(200)
+        
+        assert atm.get_balance() == 1000
+        assert atm._cash_dispenser.get_available_cash() == 100
+        assert len(atm.get_transaction_history()) == 0
+    
+    def test_withdraw_insufficient_cash_skips_bank(self, reset_mocks, monkeypatch):
+        """Test a withdrawal the ATM cannot cover never debits the account."""
+        atm = reset_mocks
+        atm._cash_dispenser.reset(100)
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+        withdrawals = count_calls(monkeypatch, MockBankService, "withdraw")
+        deposits = count_calls(monkeypatch, MockBankService, "deposit")
+        
+        with pytest.raises(InsufficientCashException):
+            atm.withdraw(200)
+        
+        assert len(withdrawals) == 0
+        assert len(deposits) == 0
+    
+    def test_withdraw_refunds_when_cash_runs_out(self, reset_mocks, monkeypatch):
+        """Test the account is refunded if the cash runs out after the check."""
+        atm = reset_mocks
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+        monkeypatch.setattr(MockCashDispenser, "try_dispense", lambda self, amount: False)
+        
+        with pytest.raises(InsufficientCashException):
+            atm.withdraw(200)
+        
+        assert atm._bank_service.get_balance("1001") == 1000
+        assert len(atm.get_transaction_history()) == 0
+    
+    @pytest.mark.parametrize("error", [
+        InsufficientCashException("Cassette empty"),
+        RuntimeError("Dispenser jammed"),
+    ])
+    def test_withdraw_refunds_when_dispenser_fails(self, error):
+        """Test a dispenser without its own try_dispense refunds on failure."""
+        atm = ATMController(MockBankService(), FaultyCashDispenser(error), MockCardReader())
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+        
+        with pytest.raises(type(error)):
+            atm.withdraw(200)
+        
+        assert atm._bank_service.get_balance("1001") == 1000
+        assert len(atm.get_transaction_history()) == 0
+    
+    def test_withdraw_reports_failed_refund(self, monkeypatch):
+        """Test a refund the bank rejects surfaces as an ATMException."""
+        atm = ATMController(
+            MockBankService(), FaultyCashDispenser(RuntimeError("Dispenser jammed")), MockCardReader()
+        )
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+        
+        def failing_deposit(self, account_number, amount):
+            raise RuntimeError("Bank unavailable")
+        
+        monkeypatch.setattr(MockBankService, "deposit", failing_deposit)
+        
+        with pytest.raises(ATMException, match="Failed to refund 200"):
+            atm.withdraw(200)
+    
+    def test_concurrent_dispense_never_overdraws(self):
+        """Test concurrent dispenses cannot take more cash than is available."""
+        dispenser = RacingCashDispenser(initial_cash=600)
+        results = []
+        
+        def dispense():
+            try:
+                results.append(dispenser.dispense_cash(500))
+            except InsufficientCashException:
+                results.append(False)
+        
+        threads = [threading.Thread(target=dispense) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert results.count(True) == 1
+        assert dispenser.get_available_cash() == 100
+    
+    def test_card_number_rule_matches_bank(self):
+        """Test the Card model accepts the same card numbers as the bank."""
+        expiry = datetime.now() + timedelta(days=365)
+        
+        for card_number in ("123456789012", "1234567890123456789", "123456789012345\u00b2"):
+            with pytest.raises(ValueError):
+                Card(card_number, "Test Holder", expiry)
+        
+        assert Card("1234567890123456", "Test Holder", expiry).card_number == "1234567890123456"
+    
+    def test_card_cached_fields_follow_assignment(self):
+        """Test expiry and mask stay correct when card fields are reassigned."""
+        card = Card("1234567890123456", "Test Holder", datetime.now() + timedelta(days=365))
+        assert not card.is_expired()
+        
+        card.expiry_date = datetime.now() - timedelta(days=1)
+        card.card_number = "6543210987654321"
+        
+        assert card.is_expired()
+        assert card.mask_card_number() == "************4321"
+    
+    def test_account_mask_follows_assignment(self):
+        """Test the masked account number is recomputed when the number changes."""
+        account = Account("10012345", AccountType.CHECKING, 100, "Test")
+        assert account.mask_account_number() == "****2345"
+        
+        account.account_number = "99"
+        
+        assert account.mask_account_number() == "**"
+    
+    def test_account_default_withdrawal_limits(self):
+        """Test accounts without a limit get their type's default."""
+        def make(account_type):
+            return Account("9001", account_type, 100, "Test")
+        
+        assert make(AccountType.CHECKING).daily_withdrawal_limit == 1000
+        assert make(AccountType.SAVINGS).daily_withdrawal_limit == 500
+        assert make(AccountType.CREDIT).daily_withdrawal_limit == 300
+        assert make("brokerage").daily_withdrawal_limit == 300  # Unrecognised type
+    
     def test_withdraw_invalid_amount(self, reset_mocks):
         """Test withdrawal with invalid amount."""
         atm = reset_mocks
@@ -282,6 +570,76 @@ class TestATMController:
         assert history[1].transaction_type == TransactionType.WITHDRAWAL
         assert history[2].transaction_type == TransactionType.DEPOSIT
     
+    def test_transaction_history_snapshot(self, reset_mocks):
+        """Test history is shared until a new transaction is recorded."""
+        atm = reset_mocks
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+        atm.deposit(100)
+        
+        history = atm.get_transaction_history()
+        assert atm.get_transaction_history() is history
+        
+        atm.withdraw(50)
+        assert len(history) == 1
+        assert len(atm.get_transaction_history()) == 2
+    
+    def test_transaction_ids_sort_by_creation(self, reset_mocks):
+        """Test transaction ids are unique and ordered by creation time."""
+        atm = reset_mocks
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+        
+        for _ in range(20):
+            atm.deposit(1)
+        
+        ids = [tx.transaction_id for tx in atm.get_transaction_history()]
+        assert len(set(ids)) == len(ids)
+        assert ids == sorted(ids)
+    
+    def test_transaction_create_matches_constructor(self):
+        """Test the fast factory builds the same record as the constructor."""
+        created = Transaction.create(TransactionType.DEPOSIT, 100, "1001", 1100)
+        built = Transaction(
+            transaction_type=TransactionType.DEPOSIT,
+            amount=100,
+            account_number="1001",
+            balance_after=1100,
+            transaction_id=created.transaction_id,
+            timestamp=created.timestamp
+        )
+        
+        assert created == built
+        assert created.to_dict() == built.to_dict()
+    
+    def test_iter_transaction_history(self, reset_mocks):
+        """Test iterating the history yields the same transactions in order."""
+        atm = reset_mocks
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+        atm.deposit(100)
+        atm.withdraw(50)
+        
+        assert list(atm.iter_transaction_history()) == list(atm.get_transaction_history())
+    
+    def test_transaction_history_is_bounded(self, reset_mocks, monkeypatch):
+        """Test only the most recent transactions are kept in a session."""
+        atm = reset_mocks
+        monkeypatch.setattr(ATMController, "_MAX_SESSION_TRANSACTIONS", 2)
+        atm._reset_session()
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+        
+        for amount in (10, 20, 30):
+            atm.deposit(amount)
+        
+        history = atm.get_transaction_history()
+        assert [tx.amount for tx in history] == [20, 30]
+    
     def test_eject_card(self, reset_mocks):
         """Test ejecting card and resetting session."""
         atm = reset_mocks
@@ -298,6 +656,53 @@ class TestATMController:
         assert atm._current_account is None
         assert len(atm.get_transaction_history()) == 0
     
+    def test_bank_batch(self, reset_mocks):
+        """Test batched bank operations return results in order."""
+        bank = reset_mocks._bank_service
+        
+        results = bank.batch([
+            ("get_balance", ("1001",)),
+            ("validate_card", ("1234567890123456",)),
+            ("get_account", ("9999",)),
+        ])
+        
+        assert results == [1000, True, None]
+        with pytest.raises(ValueError):
+            bank.batch([("reset_accounts", ())])
+        with pytest.raises(ValueError):
+            bank.batch([("deposit", ("1001", 100))])
+        with pytest.raises(ValueError):
+            bank.batch([("get_balance", ("1001",))] * (bank.MAX_BATCH_SIZE + 1))
+    
+    def test_bank_batch_failure(self, reset_mocks):
+        """Test a failing batched operation raises without changing any balance."""
+        bank = reset_mocks._bank_service
+        
+        with pytest.raises(ValueError, match="not found"):
+            bank.batch([("get_balance", ("1001",)), ("get_balance", ("9999",))])
+        
+        assert bank.get_balance("1001") == 1000
+    
+    def test_add_test_card_unknown_account(self, reset_mocks):
+        """Test linking a card to an account that does not exist fails loudly."""
+        bank = reset_mocks._bank_service
+        
+        with pytest.raises(KeyError):
+            bank.add_test_card("4444444444444444", "1111", ["9001"])
+        
+        assert not bank.validate_card("4444444444444444")
+    
+    def test_add_test_account_relinks_cards(self, reset_mocks):
+        """Test replacing an account updates the cards linked to it."""
+        bank = reset_mocks._bank_service
+        replacement = Account("1001", AccountType.CHECKING, 7, "Replacement Checking")
+        
+        bank.add_test_account(replacement)
+        
+        accounts = bank.get_accounts("1234567890123456")
+        assert accounts[0] is replacement
+        assert accounts[0].balance == bank.get_balance("1001") == 7
+    
     def test_complete_atm_workflow(self, reset_mocks):
         """Test complete ATM workflow from start to finish."""
         atm = reset_mocks
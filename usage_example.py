@@ -21,16 +21,32 @@ from atm_controller import ATMController, ATMState
 from mocks.mock_bank_service import MockBankService
 from mocks.mock_cash_dispenser import MockCashDispenser
 from mocks.mock_card_reader import MockCardReader
+from models.transaction import TransactionType
 from exceptions.atm_exceptions import *
 
 import time  # might need this later for delays
 
+_SEP = "=" * 60
+
+# State tracing is dropped when running under python -O
+VERBOSE = __debug__
+
+# Message template for each ATM error type; other ATM errors use a generic one
+_ERROR_MESSAGES = {
+    InvalidCardException: "❌ Invalid Card Error: {}",
+    InvalidPinException: "❌ Invalid PIN Error: {}",
+    InsufficientFundsException: "❌ Insufficient Funds Error: {}",
+    InsufficientCashException: "❌ Insufficient Cash Error: {}",
+    AccountNotFoundException: "❌ Account Not Found Error: {}",
+}
+
+
 def print_separator(title=""):
     """Print a visual separator."""
-    print("\n" + "="*60)
+    banner = "\n" + _SEP
     if title:
-        print(f" {title} ")
-        print("="*60)
+        banner += f"\n {title} \n" + _SEP
+    sys.stdout.write(banner + "\n")
 
 
 def demonstrate_atm_workflow():
@@ -46,7 +62,8 @@ def demonstrate_atm_workflow():
     
     print(f" ATM initialized successfully")
     print(f" ATM Cash Available: ${cash_dispenser.get_available_cash()}")
-    print(f" ATM State: {atm.get_state().value}")
+    if VERBOSE:
+        print(f" ATM State: {atm.get_state().value}")
     
     try:
         print_separator("Card Insertion and PIN Entry")
@@ -55,13 +72,15 @@ def demonstrate_atm_workflow():
         print(" Inserting card: 1234567890123456")
         atm.insert_card("1234567890123456")
         print(f" Card inserted successfully")
-        print(f" ATM State: {atm.get_state().value}")
+        if VERBOSE:
+            print(f" ATM State: {atm.get_state().value}")
         
         # 2. Enter PIN
         print(" Entering PIN: 1234")
         atm.enter_pin("1234")
         print(f" PIN verified successfully")
-        print(f" ATM State: {atm.get_state().value}")
+        if VERBOSE:
+            print(f" ATM State: {atm.get_state().value}")
         
         print_separator("Account Selection")
         
@@ -78,7 +97,8 @@ def demonstrate_atm_workflow():
         print(f"\n Selecting account: {selected_account}")
         account = atm.select_account(selected_account)
         print(f" Account selected: {account.account_name}")
-        print(f" ATM State: {atm.get_state().value}")
+        if VERBOSE:
+            print(f" ATM State: {atm.get_state().value}")
         
         print_separator("Banking Operations")
         
@@ -117,22 +137,25 @@ def demonstrate_atm_workflow():
         print_separator("Transaction History")
         
         # 9. View transaction history
-        print("Transaction history for this session:")
-        history = atm.get_transaction_history()
-        for i, tx in enumerate(history, 1):
-            tx_type = tx.transaction_type.value.title()
-            print(f"   {i}. {tx_type}: ${tx.amount} "
-                  f"(Balance: ${tx.balance_after}) "
-                  f"at {tx.timestamp.strftime('%H:%M:%S')}")
-        
-        print(f"\n Total transactions: {len(history)}")
-        total_deposited = sum(tx.amount for tx in history 
-                            if tx.transaction_type.value == 'deposit')
-        total_withdrawn = sum(tx.amount for tx in history 
-                            if tx.transaction_type.value == 'withdrawal')
-        print(f"Total deposited: ${total_deposited}")
-        print(f"Total withdrawn: ${total_withdrawn}")
-        print(f"Net change: ${total_deposited - total_withdrawn}")
+        # Collect, count and total the history in a single pass, then write it at once
+        lines = ["Transaction history for this session:"]
+        totals = dict.fromkeys(TransactionType, 0)
+        time_format = '%H:%M:%S'
+        transaction_count = 0
+        for transaction_count, tx in enumerate(atm.iter_transaction_history(), 1):
+            tx_type = tx.transaction_type
+            lines.append(f"   {transaction_count}. {tx_type.value.title()}: ${tx.amount} "
+                         f"(Balance: ${tx.balance_after}) "
+                         f"at {tx.timestamp.strftime(time_format)}")
+            totals[tx_type] += tx.amount
+        total_deposited = totals[TransactionType.DEPOSIT]
+        total_withdrawn = totals[TransactionType.WITHDRAWAL]
+        
+        lines.append(f"\n Total transactions: {transaction_count}")
+        lines.append(f"Total deposited: ${total_deposited}")
+        lines.append(f"Total withdrawn: ${total_withdrawn}")
+        lines.append(f"Net change: ${total_deposited - total_withdrawn}")
+        sys.stdout.write("\n".join(lines) + "\n")
         
         print_separator("Session Completion")
         
@@ -144,36 +167,60 @@ def demonstrate_atm_workflow():
         print(" Ejecting card and ending session...")
         atm.eject_card()
         print(f"Card ejected successfully")
-        print(f"ATM State: {atm.get_state().value}")
+        if VERBOSE:
+            print(f"ATM State: {atm.get_state().value}")
         
         print_separator("Session Summary")
-        print("ATM workflow completed successfully!")
-        print(f"Session duration: Complete workflow executed")
-        print(f"Transactions processed: {len(history)}")
-        print(f"Final balance: ${final_balance}")
-        print(f"ATM ready for next customer")
-        
-    except InvalidCardException as e:
-        print(f"❌ Invalid Card Error: {e}")
-    except InvalidPinException as e:
-        print(f"❌ Invalid PIN Error: {e}")
-    except InsufficientFundsException as e:
-        print(f"❌ Insufficient Funds Error: {e}")
-    except InsufficientCashException as e:
-        print(f"❌ Insufficient Cash Error: {e}")
-    except AccountNotFoundException as e:
-        print(f"❌ Account Not Found Error: {e}")
+        summary = [
+            "ATM workflow completed successfully!",
+            "Session duration: Complete workflow executed",
+            f"Transactions processed: {transaction_count}",
+            f"Final balance: ${final_balance}",
+            "ATM ready for next customer",
+        ]
+        sys.stdout.write("\n".join(summary) + "\n")
+        
     except ATMException as e:
-        print(f"❌ ATM Error: {e}")
+        print(_ERROR_MESSAGES.get(type(e), "❌ ATM Error: {}").format(e))
     except Exception as e:
         print(f"❌ Unexpected Error: {e}")
     finally:
         # Always ensure card is ejected
-        if atm.get_state() != ATMState.IDLE:
+        if atm.get_state() is not ATMState.IDLE:
             print("🔧 Cleaning up session...")
             atm.eject_card()
 
 
+def _scenario_invalid_card(atm):
+    atm.insert_card("0000000000000000")
+
+
+def _scenario_wrong_pin(atm):
+    atm.insert_card("1234567890123456")
+    atm.enter_pin("0000")
+
+
+def _scenario_insufficient_funds(atm):
+    atm.withdraw(5000)  # More than balance
+
+
+def _scenario_insufficient_cash(atm):
+    atm.withdraw(200)  # More than ATM cash (100)
+
+
+def run_error_scenario(atm, scenario_name, scenario_func):
+    """Run one error scenario and report whether the expected error occurred."""
+    try:
+        print(f"\n Testing: {scenario_name}")
+        scenario_func(atm)
+        print(f"❓ Expected error but none occurred")
+    except (InvalidCardException, InvalidPinException, 
+            InsufficientFundsException, InsufficientCashException) as e:
+        print(f"✅ Caught expected error: {type(e).__name__}: {e}")
+    except Exception as e:
+        print(f"❌ Unexpected error: {type(e).__name__}: {e}")
+
+
 def demonstrate_error_scenarios():
     """Demonstrate error handling scenarios."""
     print_separator("Error Handling Demonstration")
@@ -183,46 +230,41 @@ def demonstrate_error_scenarios():
     card_reader = MockCardReader()
     atm = ATMController(bank_service, cash_dispenser, card_reader)
     
-    scenarios = [
-        ("Invalid Card", lambda: atm.insert_card("0000000000000000")),
-        ("Wrong PIN", lambda: (atm.insert_card("1234567890123456"), 
-                             atm.enter_pin("0000"))),
-        ("Insufficient Funds", lambda: (
-            atm.insert_card("1234567890123456"),
-            atm.enter_pin("1234"),
-            atm.select_account("1001"),
-            atm.withdraw(5000)  # More than balance
-        )),
-        ("Insufficient ATM Cash", lambda: (
-            atm._reset_session(),
-            atm.insert_card("1234567890123456"),
-            atm.enter_pin("1234"),
-            atm.select_account("1001"),
-            atm.withdraw(200)  # More than ATM cash (100)
-        )),
+    # Failures before an account is selected, each from a fresh session
+    pre_auth_scenarios = [
+        ("Invalid Card", _scenario_invalid_card),
+        ("Wrong PIN", _scenario_wrong_pin),
+    ]
+    
+    # Failed withdrawals leave the session open, so these share one login
+    post_auth_scenarios = [
+        ("Insufficient Funds", _scenario_insufficient_funds),
+        ("Insufficient ATM Cash", _scenario_insufficient_cash),
     ]
     
-    for scenario_name, scenario_func in scenarios:
-        try:
-            print(f"\n Testing: {scenario_name}")
-            if callable(scenario_func):
-                scenario_func()
-            else:
-                for func in scenario_func:
-                    func()
-            print(f"❓ Expected error but none occurred")
-        except (InvalidCardException, InvalidPinException, 
-                InsufficientFundsException, InsufficientCashException) as e:
-            print(f"✅ Caught expected error: {type(e).__name__}: {e}")
-        except Exception as e:
-            print(f"❌ Unexpected error: {type(e).__name__}: {e}")
-        finally:
-            atm._reset_session()
+    for scenario_name, scenario_func in pre_auth_scenarios:
+        run_error_scenario(atm, scenario_name, scenario_func)
+        atm._reset_session()
+    
+    try:
+        atm.insert_card("1234567890123456")
+        atm.enter_pin("1234")
+        atm.select_account("1001")
+    except Exception as e:
+        print(f"\n❌ Unexpected error during login: {type(e).__name__}: {e}")
+        atm._reset_session()
+        return
+    
+    try:
+        for scenario_name, scenario_func in post_auth_scenarios:
+            run_error_scenario(atm, scenario_name, scenario_func)
+    finally:
+        atm._reset_session()
 
 
 if __name__ == "__main__":
     print("Starting ATM Controller Demonstration")
-    print("="*60)
+    print(_SEP)
     
     # Run main workflow demonstration
     demonstrate_atm_workflow()